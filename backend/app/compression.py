@@ -0,0 +1,107 @@
+"""
+Response compression middleware.
+
+Negotiates brotli or gzip from the Accept-Encoding header and only
+compresses bodies above a size threshold. Brotli is used when the optional
+`brotli` package is installed; otherwise responses fall back to gzip.
+"""
+import gzip
+import importlib.util
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_MINIMUM_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+
+def _brotli_available() -> bool:
+    return importlib.util.find_spec("brotli") is not None
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each encoding in an Accept-Encoding header to its q-value."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class CompressionMiddleware:
+    """Compress responses with brotli or gzip, whichever the client prefers."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = DEFAULT_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings: List[str] = ["br", "gzip"] if _brotli_available() else ["gzip"]
+
+    def choose_encoding(self, accept_encoding: str) -> Optional[str]:
+        """Pick the supported encoding with the highest q-value, preferring brotli on ties."""
+        accepted = _parse_accept_encoding(accept_encoding)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            q = accepted.get(encoding, accepted.get("*", 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self.choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                # Every negotiated response varies by Accept-Encoding, compressed or
+                # not, so shared caches don't hand a compressed body to other clients
+                message["headers"] = list(message.get("headers", []))
+                MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+                # Hold the headers back until we know whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            # Unaccepted, streaming, tiny or already-encoded responses go out untouched
+            if (encoding is None or message.get("more_body", False)
+                    or len(body) < self.minimum_size or "content-encoding" in headers):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            body = self.compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def compress(body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            import brotli
+
+            return brotli.compress(body, quality=BROTLI_QUALITY)
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
@@ -1,16 +1,81 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime
 
 from .models import (
     Thought, ThoughtCreate, Task, TaskCreate, TaskUpdate,
-    ExtractTasksRequest, ExtractTasksResponse, ThoughtWithTasks
+    ExtractTasksRequest, ExtractTasksResponse, ThoughtWithTasks,
+    DedupeMode, DuplicateMatch, MergedTask, ThoughtView,
+    Revision, RevisionState, HistorySnapshot
 )
-from .services import storage
+from .compression import CompressionMiddleware
+from .services import serialization, storage
+from .services.history import SNAPSHOT_INTERVAL_SECONDS
+from .services.scheduling import ReminderScheduler
 from .services.ai_extraction import extract_tasks_from_thought
 
-app = FastAPI(title="StrataGist API", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+BACKGROUND_CLAIM_RETRY_SECONDS = 30
+
+
+async def snapshot_history_periodically():
+    """Seal history changes into a compressed snapshot at a fixed interval."""
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(storage.snapshot_history)
+        except Exception:
+            # Changes stay in the active segment, so the next snapshot picks them up
+            logger.exception("History snapshot failed")
+
+
+def log_due_tasks(tasks: List[Task]):
+    """Deliver reminders for tasks that just became due."""
+    for task in tasks:
+        logger.info("Reminder: %r is due (%s)", task.title, task.due_date.isoformat())
+
+
+reminders = ReminderScheduler(
+    next_due_after=storage.get_next_due_after,
+    due_between=storage.get_tasks_due_between,
+    on_due=log_due_tasks,
+    load_checkpoint=storage.get_reminder_checkpoint,
+    save_checkpoint=storage.set_reminder_checkpoint,
+)
+storage.subscribe_due_changes(reminders.notify)
+
+
+async def run_background_jobs():
+    """
+    Run reminders and history snapshots in one worker per data directory.
+    The others keep retrying, so one takes over if that worker exits.
+    """
+    while not await asyncio.to_thread(storage.claim_background_jobs):
+        await asyncio.sleep(BACKGROUND_CLAIM_RETRY_SECONDS)
+    await asyncio.gather(snapshot_history_periodically(), reminders.run())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize storage once, then warm the indexes while already serving."""
+    storage.ensure_data_dir()
+    warmup = asyncio.create_task(asyncio.to_thread(storage.warm_indexes))
+    background = asyncio.create_task(run_background_jobs())
+    yield
+    background.cancel()
+    with suppress(asyncio.CancelledError):
+        await background
+    storage.release_background_jobs()
+    await warmup
+
+
+app = FastAPI(title="StrataGist API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware for frontend
 app.add_middleware(
@@ -20,6 +85,59 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+
+def find_duplicates(
+    tasks: List[Task], mode: DedupeMode
+) -> Tuple[List[Task], Dict[str, List[DuplicateMatch]], List[MergedTask]]:
+    """
+    Check extracted tasks against existing ones.
+    Returns the tasks to keep, the duplicates found for each kept task
+    (flag mode) and the tasks merged into their best match (merge mode).
+    """
+    if mode == "off":
+        return tasks, {}, []
+
+    kept = []
+    duplicates = {}
+    merged = []
+    for task in tasks:
+        matches = storage.find_duplicate_tasks(task.title)
+        if not matches:
+            kept.append(task)
+        elif mode == "merge":
+            existing, similarity = matches[0]
+            merged.append(MergedTask(extracted=task, existing=existing, similarity=similarity))
+        else:
+            kept.append(task)
+            duplicates[task.id] = [
+                DuplicateMatch(task=match, similarity=similarity)
+                for match, similarity in matches
+            ]
+    return kept, duplicates, merged
+
+
+def thoughts_response(thoughts: List[Thought], fields: Optional[str], view: ThoughtView):
+    """Serialize a list of thoughts, honoring the `fields` and `view` parameters."""
+    if view == "summary":
+        allowed, to_row = serialization.THOUGHT_SUMMARY_FIELDS, serialization.thought_summary
+    else:
+        allowed, to_row = serialization.THOUGHT_FIELDS, None
+    try:
+        selected = serialization.parse_fields(fields, allowed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return serialization.json_response(serialization.project(thoughts, selected, to_row))
+
+
+def tasks_response(tasks: List[Task], fields: Optional[str]):
+    """Serialize a list of tasks, honoring the `fields` parameter."""
+    try:
+        selected = serialization.parse_fields(fields, serialization.TASK_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return serialization.json_response(serialization.project(tasks, selected))
 
 
 @app.get("/health")
@@ -29,11 +147,18 @@ def health():
 
 # ========== THOUGHTS ENDPOINTS ==========
 
-@app.get("/api/thoughts", response_model=List[Thought])
-def list_thoughts():
-    """Get all thoughts, sorted by timestamp (newest first)."""
+@app.get("/api/thoughts")
+def list_thoughts(fields: Optional[str] = None, view: ThoughtView = "full"):
+    """
+    Get all thoughts, sorted by timestamp (newest first).
+
+    Returns a JSON array of objects. With view=full (default) each object has
+    the Thought fields (id, content, timestamp); with view=summary it has the
+    ThoughtSummary fields (id, content truncated to 150 characters, timestamp,
+    is_truncated). `fields` is a comma-separated subset of those to return.
+    """
     thoughts = storage.get_all_thoughts()
-    return sorted(thoughts, key=lambda t: t.timestamp, reverse=True)
+    return thoughts_response(sorted(thoughts, key=lambda t: t.timestamp, reverse=True), fields, view)
 
 
 @app.get("/api/thoughts/dates", response_model=List[str])
@@ -43,31 +168,37 @@ def get_thought_dates():
     return [d.isoformat() for d in dates]
 
 
-@app.get("/api/thoughts/date/{date}", response_model=List[Thought])
-def get_thoughts_for_date(date: str):
-    """Get thoughts for a specific date."""
+@app.get("/api/thoughts/date/{date}")
+def get_thoughts_for_date(date: str, fields: Optional[str] = None, view: ThoughtView = "full"):
+    """
+    Get thoughts for a specific date.
+    Same response shape and `fields`/`view` parameters as GET /api/thoughts.
+    """
     try:
         dt = datetime.fromisoformat(date)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format")
     
     thoughts = storage.get_thoughts_by_date(dt)
-    return sorted(thoughts, key=lambda t: t.timestamp, reverse=True)
+    return thoughts_response(sorted(thoughts, key=lambda t: t.timestamp, reverse=True), fields, view)
 
 
 @app.post("/api/thoughts", response_model=ThoughtWithTasks)
-def create_thought(thought_create: ThoughtCreate):
+def create_thought(thought_create: ThoughtCreate, dedupe: DedupeMode = "off"):
     """Create a new thought and extract tasks from it."""
     thought = Thought(content=thought_create.content)
     storage.add_thought(thought)
     
     # Extract tasks from the thought
     tasks, used_ai = extract_tasks_from_thought(thought)
+    tasks, duplicates, merged = find_duplicates(tasks, dedupe)
     
     return ThoughtWithTasks(
         thought=thought,
         extracted_tasks=tasks,
-        used_ai=used_ai
+        used_ai=used_ai,
+        duplicates=duplicates,
+        merged=merged
     )
 
 
@@ -111,11 +242,17 @@ def clear_thoughts_for_date(date: str):
 
 # ========== TASKS ENDPOINTS ==========
 
-@app.get("/api/tasks", response_model=List[Task])
-def list_tasks():
-    """Get all tasks, sorted by creation date (newest first)."""
+@app.get("/api/tasks")
+def list_tasks(fields: Optional[str] = None):
+    """
+    Get all tasks, sorted by creation date (newest first).
+
+    Returns a JSON array of objects with the Task fields (id, title,
+    description, created_at, due_date, is_completed, thought_id), or only
+    the comma-separated subset given in `fields`.
+    """
     tasks = storage.get_all_tasks()
-    return sorted(tasks, key=lambda t: t.created_at, reverse=True)
+    return tasks_response(sorted(tasks, key=lambda t: t.created_at, reverse=True), fields)
 
 
 @app.post("/api/tasks", response_model=Task)
@@ -145,6 +282,37 @@ def create_tasks_bulk(tasks: List[TaskCreate]):
     return storage.add_tasks(new_tasks)
 
 
+@app.get("/api/tasks/due")
+def list_tasks_due(before: str, fields: Optional[str] = None):
+    """
+    Get incomplete tasks due before a date/time, earliest first.
+    Same response shape and `fields` parameter as GET /api/tasks.
+    """
+    try:
+        dt = datetime.fromisoformat(before)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+    return tasks_response(storage.get_tasks_due_before(dt), fields)
+
+
+@app.get("/api/tasks/overdue")
+def list_tasks_overdue(fields: Optional[str] = None):
+    """
+    Get incomplete tasks whose due date has passed, earliest first.
+    Same response shape and `fields` parameter as GET /api/tasks.
+    """
+    return tasks_response(storage.get_tasks_due_before(datetime.now()), fields)
+
+
+@app.get("/api/tasks/duplicates", response_model=List[DuplicateMatch])
+def get_duplicate_tasks(title: str):
+    """Get existing tasks that duplicate the given title."""
+    return [
+        DuplicateMatch(task=task, similarity=similarity)
+        for task, similarity in storage.find_duplicate_tasks(title)
+    ]
+
+
 @app.get("/api/tasks/{task_id}", response_model=Task)
 def get_task(task_id: str):
     """Get a specific task by ID."""
@@ -186,8 +354,59 @@ def delete_task(task_id: str):
 # ========== EXTRACTION ENDPOINT ==========
 
 @app.post("/api/extract-tasks", response_model=ExtractTasksResponse)
-def extract_tasks(request: ExtractTasksRequest):
-    """Extract tasks from text content."""
+def extract_tasks(request: ExtractTasksRequest, dedupe: DedupeMode = "off"):
+    """
+    Extract tasks from text content.
+    With dedupe=flag, tasks duplicating existing ones are kept and their
+    matches reported in `duplicates`; with dedupe=merge, they are left out
+    of `tasks` and listed in `merged` with the existing task they match.
+    """
     thought = Thought(id=request.thought_id, content=request.content)
     tasks, used_ai = extract_tasks_from_thought(thought)
-    return ExtractTasksResponse(tasks=tasks, used_ai=used_ai)
+    tasks, duplicates, merged = find_duplicates(tasks, dedupe)
+    return ExtractTasksResponse(tasks=tasks, used_ai=used_ai, duplicates=duplicates, merged=merged)
+
+
+# ========== HISTORY ENDPOINTS ==========
+
+@app.get("/api/history/snapshots", response_model=List[HistorySnapshot])
+def list_history_snapshots():
+    """Get the retained history snapshots, oldest first."""
+    return storage.list_snapshots()
+
+
+@app.post("/api/history/snapshots", response_model=Optional[HistorySnapshot])
+def create_history_snapshot():
+    """Snapshot history changes now. Returns null if nothing changed since the last one."""
+    return storage.snapshot_history()
+
+
+@app.get("/api/history/{record_id}", response_model=List[Revision])
+def get_history(record_id: str):
+    """Get the revisions of a thought or task, oldest first."""
+    revisions = storage.get_history(record_id)
+    if not revisions:
+        raise HTTPException(status_code=404, detail="No history for record")
+    return revisions
+
+
+@app.get("/api/history/{record_id}/{rev}", response_model=RevisionState)
+def get_revision(record_id: str, rev: int):
+    """Get a thought or task as it was at a revision."""
+    revision = storage.get_revision(record_id, rev)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    kind, state = revision
+    return RevisionState(id=record_id, rev=rev, kind=kind, state=state)
+
+
+@app.post("/api/history/{record_id}/{rev}/restore", response_model=Union[Task, Thought])
+def restore_revision(record_id: str, rev: int):
+    """Restore a thought or task to a revision, recreating it if it was deleted."""
+    try:
+        restored = storage.restore_revision(record_id, rev)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if restored is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return restored
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
 from datetime import datetime
 from uuid import uuid4
 
@@ -19,6 +19,17 @@ class Thought(BaseModel):
         }
 
 
+class ThoughtSummary(BaseModel):
+    id: str
+    content: str
+    timestamp: datetime
+    is_truncated: bool = False
+
+
+# full: complete thoughts, summary: truncated content
+ThoughtView = Literal["full", "summary"]
+
+
 class Task(BaseModel):
     id: str = Field(default_factory=generate_id)
     title: str
@@ -57,12 +68,59 @@ class ExtractTasksRequest(BaseModel):
     content: str
 
 
+# off: no duplicate check
+# flag: keep duplicates and report their matches in `duplicates`
+# merge: drop duplicates and report them in `merged`
+DedupeMode = Literal["off", "flag", "merge"]
+
+
+class DuplicateMatch(BaseModel):
+    task: Task
+    similarity: float
+
+
+class MergedTask(BaseModel):
+    # The extracted task that was dropped, and the existing task it was merged into
+    extracted: Task
+    existing: Task
+    similarity: float
+
+
 class ExtractTasksResponse(BaseModel):
     tasks: List[Task]
     used_ai: bool = False
+    # Extracted task ID -> existing tasks it duplicates (dedupe=flag)
+    duplicates: Dict[str, List[DuplicateMatch]] = Field(default_factory=dict)
+    merged: List[MergedTask] = Field(default_factory=list)
 
 
 class ThoughtWithTasks(BaseModel):
     thought: Thought
     extracted_tasks: List[Task]
     used_ai: bool = False
+    duplicates: Dict[str, List[DuplicateMatch]] = Field(default_factory=dict)
+    merged: List[MergedTask] = Field(default_factory=list)
+
+
+class Revision(BaseModel):
+    rev: int
+    kind: Literal["thought", "task"]
+    # base: full state of a record that predates its retained history
+    op: Literal["base", "create", "update", "delete", "restore"]
+    timestamp: datetime
+    # Only the fields changed by this revision
+    changes: Dict[str, Any]
+
+
+class RevisionState(BaseModel):
+    id: str
+    rev: int
+    kind: Literal["thought", "task"]
+    # None if the record was deleted at this revision
+    state: Optional[Dict[str, Any]] = None
+
+
+class HistorySnapshot(BaseModel):
+    seq: int
+    created_at: datetime
+    size_bytes: int
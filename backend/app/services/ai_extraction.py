@@ -2,19 +2,20 @@
 AI-powered task extraction service.
 Uses OpenAI API when available, falls back to rule-based extraction.
 """
+import importlib.util
 import os
 import re
+from functools import lru_cache
 from typing import List, Tuple
 from datetime import datetime
 
 from ..models import Task, Thought
 
-# Try to import OpenAI
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+
+@lru_cache(maxsize=None)
+def openai_available() -> bool:
+    """Check whether the OpenAI SDK is installed, without importing it."""
+    return importlib.util.find_spec("openai") is not None
 
 
 def extract_tasks_from_thought(thought: Thought) -> Tuple[List[Task], bool]:
@@ -23,7 +24,7 @@ def extract_tasks_from_thought(thought: Thought) -> Tuple[List[Task], bool]:
     Returns (tasks, used_ai) tuple.
     """
     # Try OpenAI first if available and configured
-    if OPENAI_AVAILABLE and os.getenv("OPENAI_API_KEY"):
+    if os.getenv("OPENAI_API_KEY") and openai_available():
         try:
             tasks = _extract_with_openai(thought)
             if tasks:
@@ -38,6 +39,9 @@ def extract_tasks_from_thought(thought: Thought) -> Tuple[List[Task], bool]:
 
 def _extract_with_openai(thought: Thought) -> List[Task]:
     """Extract tasks using OpenAI API."""
+    # Imported lazily: the SDK is slow to import and only needed with an API key
+    from openai import OpenAI
+
     client = OpenAI()
     
     prompt = f"""Analyze the following text and extract any tasks, to-dos, or action items.
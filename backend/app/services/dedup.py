@@ -0,0 +1,154 @@
+"""
+Duplicate detection for task titles.
+
+Keeps two indexes over normalized titles:
+  - an exact index (normalized title -> task IDs)
+  - a MinHash/LSH index over character shingles for near duplicates
+
+Both are updated incrementally, so a lookup only compares against the
+handful of tasks that share an LSH bucket instead of every task.
+"""
+import random
+import re
+import zlib
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+SHINGLE_SIZE = 3
+# 20 bands of 5 rows puts the LSH S-curve midpoint at (1/20)^(1/5) = 0.55.
+# A pair becomes a candidate with probability 1 - (1 - J^5)^20: ~80% at
+# J=0.6 and ~99% at 0.7, but only ~5% at 0.3 and ~0.6% at 0.2, so titles
+# that merely share a word rarely collide. Candidates are verified with
+# exact Jaccard afterwards.
+NUM_BANDS = 20
+ROWS_PER_BAND = 5
+NUM_PERMUTATIONS = NUM_BANDS * ROWS_PER_BAND
+SIMILARITY_THRESHOLD = 0.6
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Independent random coefficients (rows in a band must not be correlated),
+# from a fixed seed so signatures are stable across processes
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+del _rng
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    title = _NON_WORD.sub(" ", title.lower())
+    return _WHITESPACE.sub(" ", title).strip()
+
+
+def shingles(normalized: str) -> Set[str]:
+    """Character shingles of a normalized title."""
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+@lru_cache(maxsize=1 << 14)
+def _shingle_hashes(shingle: str) -> array:
+    """A shingle's hash under every permutation. Titles share most shingles, so these are cached."""
+    h = zlib.crc32(shingle.encode())
+    return array("I", [((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for a, b in _PERMUTATIONS])
+
+
+def minhash(shingle_set: Set[str]) -> Tuple[int, ...]:
+    """MinHash signature of a shingle set."""
+    return tuple(map(min, zip(*[_shingle_hashes(s) for s in shingle_set])))
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _bands(signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+    return [
+        (band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+        for band in range(NUM_BANDS)
+    ]
+
+
+class TitleIndex:
+    """Exact and near-duplicate index over task titles."""
+
+    def __init__(self):
+        self._exact: Dict[str, Set[str]] = defaultdict(set)
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = defaultdict(set)
+        # task_id -> (normalized title, shingles, signature)
+        self._entries: Dict[str, Tuple[str, Set[str], Tuple[int, ...]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, task_id: str, title: str):
+        """Index a task title, replacing any previous entry for the task."""
+        self.remove(task_id)
+        normalized = normalize_title(title)
+        # Titles with no words (e.g. "!!!") can't meaningfully duplicate anything
+        if not normalized:
+            return
+        shingle_set = shingles(normalized)
+        signature = minhash(shingle_set) if shingle_set else ()
+        self._entries[task_id] = (normalized, shingle_set, signature)
+        self._exact[normalized].add(task_id)
+        if signature:
+            for key in _bands(signature):
+                self._buckets[key].add(task_id)
+
+    def remove(self, task_id: str):
+        """Drop a task from the index. No-op if it isn't indexed."""
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return
+        normalized, _, signature = entry
+        _discard(self._exact, normalized, task_id)
+        if signature:
+            for key in _bands(signature):
+                _discard(self._buckets, key, task_id)
+
+    def find(self, title: str, exclude_id: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Find indexed tasks whose title duplicates `title`.
+        Returns (task_id, similarity) pairs, best match first. Exact
+        duplicates (after normalization) have similarity 1.0.
+        """
+        normalized = normalize_title(title)
+        if not normalized:
+            return []
+        matches: Dict[str, float] = {
+            task_id: 1.0 for task_id in self._exact.get(normalized, ())
+        }
+
+        shingle_set = shingles(normalized)
+        if shingle_set:
+            candidates: Set[str] = set()
+            for key in _bands(minhash(shingle_set)):
+                candidates |= self._buckets.get(key, set())
+            for task_id in candidates - matches.keys():
+                similarity = jaccard(shingle_set, self._entries[task_id][1])
+                if similarity >= SIMILARITY_THRESHOLD:
+                    matches[task_id] = similarity
+
+        matches.pop(exclude_id, None)
+        return sorted(matches.items(), key=lambda m: m[1], reverse=True)
+
+
+def _discard(index: Dict, key, task_id: str):
+    ids = index.get(key)
+    if ids is None:
+        return
+    ids.discard(task_id)
+    if not ids:
+        del index[key]
@@ -0,0 +1,264 @@
+"""
+Revision history for thoughts and tasks.
+
+Every change is appended to a log as a delta record holding only the fields
+that changed, so a record's state at any revision is rebuilt by folding its
+deltas in order. The log is split into segments:
+
+  - active.jsonl: the segment currently being appended to
+  - snapshot-<seq>-<created>.jsonl.gz: sealed, gzip-compressed segments
+
+A snapshot seals the active segment, so each one only holds the changes
+made since the previous snapshot and quiet periods cost nothing. Once there
+are more than `retention` snapshots, the oldest is folded into the next one,
+keeping a single "base" revision per record in place of its older deltas.
+
+Several processes can share a history directory: reads, appends and
+snapshots hold a file lock and reload the log first if another process
+changed it, so sequence numbers stay unique.
+"""
+import gzip
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .locking import FileLock
+
+SNAPSHOT_INTERVAL_SECONDS = 60 * 60
+SNAPSHOT_RETENTION = 24
+
+ACTIVE_SEGMENT = "active.jsonl"
+LOCK_FILE = "history.lock"
+SNAPSHOT_PREFIX = "snapshot-"
+SNAPSHOT_SUFFIX = ".jsonl.gz"
+SNAPSHOT_TIME_FORMAT = "%Y%m%dT%H%M%S"
+
+
+def fold(entries: List[dict]) -> Optional[dict]:
+    """Rebuild a record's state from its revisions. None means deleted."""
+    state = None
+    for entry in entries:
+        if entry["op"] == "delete":
+            state = None
+        elif entry["op"] in ("base", "create"):
+            state = dict(entry["changes"])
+        else:
+            state = {**(state or {}), **entry["changes"]}
+    return state
+
+
+def _read_segment(path: Path) -> Iterator[dict]:
+    opener = gzip.open if path.name.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _snapshot_name_parts(path: Path) -> List[str]:
+    return path.name[len(SNAPSHOT_PREFIX):-len(SNAPSHOT_SUFFIX)].split("-")
+
+
+def _snapshot_seq(path: Path) -> int:
+    return int(_snapshot_name_parts(path)[0])
+
+
+def _snapshot_created_at(path: Path) -> datetime:
+    # Kept in the name because folding rewrites the file (and its mtime)
+    return datetime.strptime(_snapshot_name_parts(path)[1], SNAPSHOT_TIME_FORMAT)
+
+
+class HistoryStore:
+    """Append-only delta log of record revisions, indexed in memory by record ID."""
+
+    def __init__(self, directory: Path, retention: int = SNAPSHOT_RETENTION):
+        self.directory = directory
+        self.retention = retention
+        self.active_file = directory / ACTIVE_SEGMENT
+        self._lock = FileLock(directory / LOCK_FILE)
+        self._revisions: Dict[str, List[dict]] = {}
+        self._seqs: Set[int] = set()
+        self._seq = 0
+        self._pending = 0
+        self._version = None
+        with self._lock:
+            self._load()
+
+    def _files_version(self) -> tuple:
+        """(name, mtime_ns, size) of every log file, to detect writes by other processes."""
+        files = self._segments() + ([self.active_file] if self.active_file.exists() else [])
+        version = []
+        for path in files:
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            version.append((path.name, st.st_mtime_ns, st.st_size))
+        return tuple(version)
+
+    def refresh(self):
+        """Reload the log if another process has changed it since we last read or wrote it."""
+        with self._lock:
+            if self._files_version() != self._version:
+                self._revisions = {}
+                self._seqs = set()
+                self._seq = 0
+                self._pending = 0
+                self._load()
+
+    def _load(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for segment in self._segments():
+            for entry in _read_segment(segment):
+                self._index(entry)
+        if self.active_file.exists():
+            for entry in _read_segment(self.active_file):
+                if self._index(entry):
+                    self._pending += 1
+            if self._pending == 0:
+                # Left over from a crash after its snapshot was written
+                self.active_file.unlink()
+        self._version = self._files_version()
+
+    def _index(self, entry: dict) -> bool:
+        """Add an entry to the in-memory index. Returns False if its seq was already indexed."""
+        if entry["seq"] in self._seqs:
+            return False
+        self._seqs.add(entry["seq"])
+        self._revisions.setdefault(entry["id"], []).append(entry)
+        self._seq = max(self._seq, entry["seq"])
+        return True
+
+    def _segments(self) -> List[Path]:
+        return sorted(self.directory.glob(f"{SNAPSHOT_PREFIX}*{SNAPSHOT_SUFFIX}"), key=_snapshot_seq)
+
+    # ---------- recording ----------
+
+    def record(self, kind: str, record_id: str, before: Optional[dict], after: Optional[dict],
+               op: Optional[str] = None):
+        """
+        Record a change from `before` to `after` (None for a missing record).
+        Only the changed fields are stored. Records that predate the history
+        get a base revision with their previous state first.
+        """
+        if after is None:
+            changes = {}
+            op = op or "delete"
+        elif before is None:
+            changes = after
+            op = op or "create"
+        else:
+            changes = {k: v for k, v in after.items() if before.get(k) != v}
+            if not changes:
+                return
+            op = op or "update"
+
+        with self._lock:
+            # Pick up other processes' entries so seq and rev continue from theirs
+            self.refresh()
+            if not self._revisions.get(record_id) and before is not None:
+                self._append(kind, record_id, "base", before)
+            self._append(kind, record_id, op, changes)
+
+    def _append(self, kind: str, record_id: str, op: str, changes: dict):
+        revisions = self._revisions.get(record_id)
+        self._seq += 1
+        entry = {
+            "seq": self._seq,
+            "id": record_id,
+            "kind": kind,
+            "rev": revisions[-1]["rev"] + 1 if revisions else 1,
+            "op": op,
+            "timestamp": datetime.now().isoformat(),
+            "changes": changes,
+        }
+        self._index(entry)
+        with self.active_file.open("a") as f:
+            f.write(json.dumps(entry) + "\n")
+        self._pending += 1
+        self._version = self._files_version()
+
+    # ---------- queries ----------
+
+    def revisions(self, record_id: str) -> List[dict]:
+        """All retained revisions of a record, oldest first."""
+        return list(self._revisions.get(record_id, []))
+
+    def state_at(self, record_id: str, rev: int) -> Tuple[str, Optional[dict]]:
+        """
+        Get (kind, state) of a record as of revision `rev`.
+        Raises KeyError if the revision isn't retained.
+        """
+        revisions = self._revisions.get(record_id, [])
+        upto = [e for e in revisions if e["rev"] <= rev]
+        if not upto or upto[-1]["rev"] != rev:
+            raise KeyError(rev)
+        return upto[-1]["kind"], fold(upto)
+
+    # ---------- snapshots ----------
+
+    def snapshots(self) -> List[dict]:
+        """Sealed snapshots, oldest first."""
+        with self._lock:
+            return [
+                {
+                    "seq": _snapshot_seq(path),
+                    "created_at": _snapshot_created_at(path),
+                    "size_bytes": path.stat().st_size,
+                }
+                for path in self._segments()
+            ]
+
+    def snapshot(self) -> Optional[dict]:
+        """
+        Seal the active segment into a compressed snapshot.
+        Returns None when nothing changed since the last snapshot.
+        """
+        with self._lock:
+            self.refresh()
+            if self._pending == 0:
+                return None
+            created = datetime.now().strftime(SNAPSHOT_TIME_FORMAT)
+            path = self.directory / f"{SNAPSHOT_PREFIX}{self._seq:012d}-{created}{SNAPSHOT_SUFFIX}"
+            tmp = path.with_name(path.name + ".tmp")
+            with gzip.open(tmp, "wb") as out:
+                out.write(self.active_file.read_bytes())
+            tmp.replace(path)
+            # A crash here leaves both files; _load skips the already-snapshotted entries
+            self.active_file.unlink()
+            self._pending = 0
+            self._enforce_retention()
+            self._version = self._files_version()
+            return next(s for s in self.snapshots() if s["seq"] == self._seq)
+
+    def _enforce_retention(self):
+        segments = self._segments()
+        while len(segments) > self.retention:
+            oldest, successor = segments.pop(0), segments[0]
+            cutoff = _snapshot_seq(oldest)
+
+            # Collapse each record's revisions up to the cutoff into one base revision
+            bases = []
+            for record_id in list(self._revisions):
+                revisions = self._revisions[record_id]
+                old = [e for e in revisions if e["seq"] <= cutoff]
+                if not old:
+                    continue
+                newer = revisions[len(old):]
+                state = fold(old)
+                base = [] if state is None else [{**old[-1], "op": "base", "changes": state}]
+                if base or newer:
+                    self._revisions[record_id] = base + newer
+                else:
+                    del self._revisions[record_id]
+                bases.extend(base)
+
+            bases.sort(key=lambda e: e["seq"])
+            entries = bases + list(_read_segment(successor))
+            tmp = successor.with_name(successor.name + ".tmp")
+            with gzip.open(tmp, "wt") as out:
+                for entry in entries:
+                    out.write(json.dumps(entry) + "\n")
+            tmp.replace(successor)
+            oldest.unlink()
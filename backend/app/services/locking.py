@@ -0,0 +1,70 @@
+"""
+Inter-process file locks, so several workers can share the data directory.
+
+Uses `fcntl.flock`, which is released automatically when the holding
+process exits. On platforms without `fcntl` (Windows) the locks only
+serialize threads within one process, so run a single worker there.
+"""
+import threading
+from pathlib import Path
+from typing import IO, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+class FileLock:
+    """
+    Exclusive lock on a lock file, shared by threads and processes.
+    Re-entrant within a thread, like threading.RLock.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._file: Optional[IO] = None
+        self._depth = 0
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = _lock_file(self.path, blocking=True)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+
+def try_lock(path: Path) -> Optional[IO]:
+    """
+    Take an exclusive lock on `path` without waiting. Returns the open lock
+    file (keep it open to hold the lock), or None if another process holds it.
+    """
+    return _lock_file(path, blocking=False)
+
+
+def _lock_file(path: Path, blocking: bool) -> Optional[IO]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    f = path.open("a")
+    if fcntl is None:
+        return f
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return None
+    except BaseException:
+        f.close()
+        raise
+    return f
@@ -0,0 +1,152 @@
+"""
+Due-date index and reminder scheduler for tasks.
+
+The index keeps incomplete tasks with a due date in a list sorted by due
+date, so "due before X" is a binary search plus a slice, and the next due
+time is a single lookup. The scheduler sleeps until that next due time (or
+until the index changes) instead of polling. Changes made by other worker
+processes don't wake it, so it also rechecks every RESYNC_INTERVAL_SECONDS.
+"""
+import asyncio
+import logging
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from operator import itemgetter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..models import Task
+
+logger = logging.getLogger(__name__)
+
+RESYNC_INTERVAL_SECONDS = 60
+
+_due_key = itemgetter(0)
+
+
+def as_local_naive(dt: datetime) -> datetime:
+    """Convert aware datetimes to naive local time so they compare with naive ones."""
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone().replace(tzinfo=None)
+
+
+class DueIndex:
+    """Incomplete tasks with a due date, ordered by due date."""
+
+    def __init__(self):
+        self._entries: List[Tuple[datetime, str]] = []
+        self._keys: Dict[str, Tuple[datetime, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, task: Task) -> bool:
+        """
+        Index a task, or drop it if it's completed or has no due date.
+        Returns whether the index changed.
+        """
+        key = None
+        if task.due_date is not None and not task.is_completed:
+            key = (as_local_naive(task.due_date), task.id)
+        if self._keys.get(task.id) == key:
+            return False
+        self.remove(task.id)
+        if key is not None:
+            insort(self._entries, key)
+            self._keys[task.id] = key
+        return True
+
+    def remove(self, task_id: str) -> bool:
+        """Drop a task from the index. Returns False if it wasn't indexed."""
+        key = self._keys.pop(task_id, None)
+        if key is None:
+            return False
+        del self._entries[bisect_left(self._entries, key)]
+        return True
+
+    def due_before(self, when: datetime) -> List[str]:
+        """IDs of tasks due strictly before `when`, earliest first."""
+        end = bisect_left(self._entries, as_local_naive(when), key=_due_key)
+        return [task_id for _, task_id in self._entries[:end]]
+
+    def due_between(self, start: datetime, end: datetime) -> List[str]:
+        """IDs of tasks due after `start` and up to `end`, earliest first."""
+        lo = bisect_right(self._entries, as_local_naive(start), key=_due_key)
+        hi = bisect_right(self._entries, as_local_naive(end), key=_due_key)
+        return [task_id for _, task_id in self._entries[lo:hi]]
+
+    def next_due_after(self, when: datetime) -> Optional[datetime]:
+        """The earliest due date after `when`, if any."""
+        i = bisect_right(self._entries, as_local_naive(when), key=_due_key)
+        return self._entries[i][0] if i < len(self._entries) else None
+
+
+class ReminderScheduler:
+    """
+    Calls `on_due` with the tasks that become due, waking only at the next
+    due time or when the due index changes.
+
+    With `load_checkpoint`/`save_checkpoint`, the time up to which reminders
+    were delivered is persisted, and on startup the scheduler catches up on
+    tasks that became due while it wasn't running. A crash between delivering
+    and saving can repeat those reminders once. Without a checkpoint it starts
+    from now, so tasks already overdue aren't reminded.
+    """
+
+    def __init__(
+        self,
+        next_due_after: Callable[[datetime], Optional[datetime]],
+        due_between: Callable[[datetime, datetime], List[Task]],
+        on_due: Callable[[List[Task]], None],
+        resync_seconds: float = RESYNC_INTERVAL_SECONDS,
+        load_checkpoint: Optional[Callable[[], Optional[datetime]]] = None,
+        save_checkpoint: Optional[Callable[[datetime], None]] = None,
+    ):
+        self.next_due_after = next_due_after
+        self.due_between = due_between
+        self.on_due = on_due
+        self.resync_seconds = resync_seconds
+        self.load_checkpoint = load_checkpoint
+        self.save_checkpoint = save_checkpoint
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def notify(self):
+        """Wake the scheduler to recompute its next due time. Safe to call from any thread."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        last_checked = None
+        if self.load_checkpoint is not None:
+            last_checked = await asyncio.to_thread(self.load_checkpoint)
+        if last_checked is None:
+            last_checked = datetime.now()
+        while True:
+            # Cleared before looking up the next due time so no change is missed
+            self._wakeup.clear()
+            next_due = await asyncio.to_thread(self.next_due_after, last_checked)
+            timeout = self.resync_seconds
+            if next_due is not None:
+                timeout = min(timeout, max(0.0, (next_due - datetime.now()).total_seconds()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            now = datetime.now()
+            due = await asyncio.to_thread(self.due_between, last_checked, now)
+            if due:
+                try:
+                    self.on_due(due)
+                except Exception:
+                    # Keep the scheduler alive; one failed delivery shouldn't stop all reminders
+                    logger.exception("Reminder delivery failed for %d task(s)", len(due))
+            last_checked = now
+            if self.save_checkpoint is not None:
+                try:
+                    await asyncio.to_thread(self.save_checkpoint, now)
+                except Exception:
+                    logger.exception("Saving the reminder checkpoint failed")
@@ -0,0 +1,61 @@
+"""
+Fast JSON serialization for list endpoints.
+
+Builds plain dicts straight from the stored records, limited to the
+requested fields, instead of validating and dumping a response model per
+record.
+"""
+from typing import Callable, Iterable, Optional, Sequence, Tuple
+
+from fastapi import Response
+from pydantic_core import to_json
+
+from ..models import Task, Thought, ThoughtSummary
+
+SUMMARY_LENGTH = 150
+
+TASK_FIELDS = tuple(Task.model_fields)
+THOUGHT_FIELDS = tuple(Thought.model_fields)
+THOUGHT_SUMMARY_FIELDS = tuple(ThoughtSummary.model_fields)
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Tuple[str, ...]:
+    """
+    Parse a comma-separated `fields` parameter.
+    Returns all allowed fields when none are requested; raises ValueError
+    for unknown ones.
+    """
+    if not fields:
+        return tuple(allowed)
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return requested or tuple(allowed)
+
+
+def thought_summary(thought: Thought) -> dict:
+    """Summary representation of a thought, with its content truncated."""
+    is_truncated = len(thought.content) > SUMMARY_LENGTH
+    return {
+        "id": thought.id,
+        "content": thought.content[:SUMMARY_LENGTH] + ("..." if is_truncated else ""),
+        "timestamp": thought.timestamp,
+        "is_truncated": is_truncated,
+    }
+
+
+def project(records: Iterable, fields: Sequence[str], to_row: Optional[Callable[[object], dict]] = None) -> list:
+    """Reduce records to dicts holding only `fields`."""
+    if to_row is None:
+        return [{f: getattr(r, f) for f in fields} for r in records]
+    rows = []
+    for r in records:
+        row = to_row(r)
+        rows.append({f: row[f] for f in fields})
+    return rows
+
+
+def json_response(rows: list) -> Response:
+    """Serialize rows to a compact JSON response."""
+    return Response(content=to_json(rows), media_type="application/json")
@@ -1,28 +1,143 @@
 """
 Simple JSON file-based storage for thoughts and tasks.
+
+Records are kept in in-memory indexes (keyed by ID) and every write goes
+through to both the index and the JSON file. Each access compares the
+file's mtime and size with the version the index was loaded from and
+reloads if another process (e.g. another worker) has written it since.
+Writes hold an inter-process lock on the data directory and reload before
+changing anything, so concurrent workers don't overwrite each other.
 """
 import json
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional
+from typing import IO, Callable, Dict, List, Optional, Tuple, Union
 from pathlib import Path
 
 from ..models import Thought, Task
+from .dedup import TitleIndex
+from .history import HistoryStore
+from .locking import FileLock, try_lock
+from .scheduling import DueIndex
 
 
 # Data directory
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
 THOUGHTS_FILE = DATA_DIR / "thoughts.json"
 TASKS_FILE = DATA_DIR / "tasks.json"
+HISTORY_DIR = DATA_DIR / "history"
+REMINDERS_FILE = DATA_DIR / "reminders.json"
+STORAGE_LOCK_FILE = "storage.lock"
+BACKGROUND_LOCK_FILE = "background.lock"
+
+# In-memory indexes, populated on first access (or by warm_indexes at startup)
+_thoughts: Optional[Dict[str, Thought]] = None
+_tasks: Optional[Dict[str, Task]] = None
+# (mtime_ns, size) of the files the indexes were loaded from or last saved to
+_thoughts_version: Optional[Tuple[int, int]] = None
+_tasks_version: Optional[Tuple[int, int]] = None
+# Built on the first duplicate lookup, then kept up to date incrementally
+_titles: Optional[TitleIndex] = None
+_due = DueIndex()
+_history: Optional[HistoryStore] = None
+_data_dir_ready = False
+# _lock guards the in-memory state within this process; _data_lock (taken
+# after it) serializes writes to the data files across processes
+_lock = threading.RLock()
+_data_lock: Optional[FileLock] = None
+# Held open by the one worker that runs background jobs (reminders, snapshots)
+_background_lock: Optional[IO] = None
+# Called after any change to the due index (e.g. to wake the reminder scheduler)
+_due_listeners: List[Callable[[], None]] = []
 
 
 def ensure_data_dir():
-    """Ensure data directory exists."""
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    if not THOUGHTS_FILE.exists():
-        THOUGHTS_FILE.write_text("[]")
-    if not TASKS_FILE.exists():
-        TASKS_FILE.write_text("[]")
+    """Ensure data directory exists. Only touches the filesystem once."""
+    global _data_dir_ready, _data_lock
+    if _data_dir_ready:
+        return
+    with _lock:
+        if _data_dir_ready:
+            return
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        _data_lock = FileLock(DATA_DIR / STORAGE_LOCK_FILE)
+        with _data_lock:
+            if not THOUGHTS_FILE.exists():
+                THOUGHTS_FILE.write_text("[]")
+            if not TASKS_FILE.exists():
+                TASKS_FILE.write_text("[]")
+        _data_dir_ready = True
+
+
+@contextmanager
+def _write_lock():
+    """Hold both locks for a read-modify-write of the data files."""
+    ensure_data_dir()
+    with _lock, _data_lock:
+        yield
+
+
+def claim_background_jobs() -> bool:
+    """
+    Try to become the worker that runs background jobs for this data
+    directory. Returns True if this process holds (or already held) the claim.
+    """
+    global _background_lock
+    ensure_data_dir()
+    with _lock:
+        if _background_lock is None:
+            _background_lock = try_lock(DATA_DIR / BACKGROUND_LOCK_FILE)
+        return _background_lock is not None
+
+
+def release_background_jobs():
+    """Give up the background jobs claim so another worker can take over."""
+    global _background_lock
+    with _lock:
+        if _background_lock is not None:
+            _background_lock.close()
+            _background_lock = None
+
+
+def warm_indexes():
+    """Load thoughts and tasks into memory ahead of the first request."""
+    _thought_index()
+    _task_index()
+    _history_store()
+
+
+def reset_indexes():
+    """Drop the in-memory indexes so the next access reloads from disk (e.g. after moving DATA_DIR)."""
+    global _thoughts, _tasks, _thoughts_version, _tasks_version
+    global _titles, _due, _history, _data_dir_ready, _data_lock
+    with _lock:
+        _thoughts = None
+        _tasks = None
+        _thoughts_version = None
+        _tasks_version = None
+        _titles = None
+        _due = DueIndex()
+        _history = None
+        _data_dir_ready = False
+        _data_lock = None
+
+
+def _file_version(path: Path) -> Optional[Tuple[int, int]]:
+    """Cheap change marker for a data file: (mtime_ns, size), or None if missing."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _write_atomic(path: Path, text: str):
+    """Write a file via a temp file so other processes never read it half-written."""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text)
+    tmp.replace(path)
 
 
 def datetime_serializer(obj):
@@ -44,73 +159,90 @@ def parse_datetime(dt_str: Optional[str]) -> Optional[datetime]:
 
 # ========== THOUGHTS ==========
 
-def get_all_thoughts() -> List[Thought]:
-    """Get all thoughts."""
+def _thought_to_dict(t: Thought) -> dict:
+    return {"id": t.id, "content": t.content, "timestamp": t.timestamp.isoformat()}
+
+
+def _thought_from_dict(t: dict) -> Thought:
+    return Thought(
+        id=t["id"],
+        content=t["content"],
+        timestamp=parse_datetime(t["timestamp"]) or datetime.now()
+    )
+
+
+def _load_thoughts() -> List[Thought]:
+    """Read thoughts from the JSON file."""
     ensure_data_dir()
     try:
         data = json.loads(THOUGHTS_FILE.read_text())
-        return [
-            Thought(
-                id=t["id"],
-                content=t["content"],
-                timestamp=parse_datetime(t["timestamp"]) or datetime.now()
-            )
-            for t in data
-        ]
+        return [_thought_from_dict(t) for t in data]
     except:
         return []
 
 
+def _thought_index() -> Dict[str, Thought]:
+    """Get the in-memory thought index, (re)loading it if the file changed."""
+    global _thoughts, _thoughts_version
+    ensure_data_dir()
+    if _thoughts is None or _file_version(THOUGHTS_FILE) != _thoughts_version:
+        with _lock:
+            version = _file_version(THOUGHTS_FILE)
+            if _thoughts is None or version != _thoughts_version:
+                _thoughts = {t.id: t for t in _load_thoughts()}
+                _thoughts_version = version
+    return _thoughts
+
+
+def _save_thoughts():
+    """Save the thought index to file."""
+    global _thoughts_version
+    data = [_thought_to_dict(t) for t in _thought_index().values()]
+    _write_atomic(THOUGHTS_FILE, json.dumps(data, indent=2))
+    _thoughts_version = _file_version(THOUGHTS_FILE)
+
+
+def get_all_thoughts() -> List[Thought]:
+    """Get all thoughts."""
+    return list(_thought_index().values())
+
+
 def get_thought_by_id(thought_id: str) -> Optional[Thought]:
     """Get a thought by ID."""
-    thoughts = get_all_thoughts()
-    for t in thoughts:
-        if t.id == thought_id:
-            return t
-    return None
+    return _thought_index().get(thought_id)
 
 
 def add_thought(thought: Thought) -> Thought:
     """Add a new thought."""
-    ensure_data_dir()
-    thoughts = get_all_thoughts()
-    thoughts.append(thought)
-    
-    data = [
-        {"id": t.id, "content": t.content, "timestamp": t.timestamp.isoformat()}
-        for t in thoughts
-    ]
-    THOUGHTS_FILE.write_text(json.dumps(data, indent=2))
+    with _write_lock():
+        _thought_index()[thought.id] = thought
+        _save_thoughts()
+        _history_store().record("thought", thought.id, None, _thought_to_dict(thought))
     return thought
 
 
 def update_thought(thought_id: str, content: str) -> Optional[Thought]:
     """Update a thought's content."""
-    thoughts = get_all_thoughts()
-    for i, t in enumerate(thoughts):
-        if t.id == thought_id:
-            thoughts[i] = Thought(id=t.id, content=content, timestamp=t.timestamp)
-            data = [
-                {"id": th.id, "content": th.content, "timestamp": th.timestamp.isoformat()}
-                for th in thoughts
-            ]
-            THOUGHTS_FILE.write_text(json.dumps(data, indent=2))
-            return thoughts[i]
-    return None
+    with _write_lock():
+        thoughts = _thought_index()
+        t = thoughts.get(thought_id)
+        if t is None:
+            return None
+        thoughts[thought_id] = Thought(id=t.id, content=content, timestamp=t.timestamp)
+        _save_thoughts()
+        _history_store().record("thought", thought_id, _thought_to_dict(t), _thought_to_dict(thoughts[thought_id]))
+        return thoughts[thought_id]
 
 
 def delete_thought(thought_id: str) -> bool:
     """Delete a thought."""
-    thoughts = get_all_thoughts()
-    new_thoughts = [t for t in thoughts if t.id != thought_id]
-    if len(new_thoughts) == len(thoughts):
-        return False
-    data = [
-        {"id": t.id, "content": t.content, "timestamp": t.timestamp.isoformat()}
-        for t in new_thoughts
-    ]
-    THOUGHTS_FILE.write_text(json.dumps(data, indent=2))
-    return True
+    with _write_lock():
+        t = _thought_index().pop(thought_id, None)
+        if t is None:
+            return False
+        _save_thoughts()
+        _history_store().record("thought", thought_id, _thought_to_dict(t), None)
+        return True
 
 
 def get_thoughts_by_date(date: datetime) -> List[Thought]:
@@ -133,105 +265,330 @@ def get_available_dates() -> List[datetime]:
 
 def clear_thoughts_for_date(date: datetime) -> int:
     """Clear all thoughts for a specific date. Returns count of deleted thoughts."""
-    thoughts = get_all_thoughts()
     target_date = date.date()
-    new_thoughts = [t for t in thoughts if t.timestamp.date() != target_date]
-    deleted_count = len(thoughts) - len(new_thoughts)
-    
-    data = [
-        {"id": t.id, "content": t.content, "timestamp": t.timestamp.isoformat()}
-        for t in new_thoughts
-    ]
-    THOUGHTS_FILE.write_text(json.dumps(data, indent=2))
-    return deleted_count
+    with _write_lock():
+        thoughts = _thought_index()
+        doomed = [t for t in thoughts.values() if t.timestamp.date() == target_date]
+        for t in doomed:
+            del thoughts[t.id]
+        _save_thoughts()
+        for t in doomed:
+            _history_store().record("thought", t.id, _thought_to_dict(t), None)
+    return len(doomed)
 
 
 # ========== TASKS ==========
 
-def get_all_tasks() -> List[Task]:
-    """Get all tasks."""
+def _task_to_dict(t: Task) -> dict:
+    return {
+        "id": t.id,
+        "title": t.title,
+        "description": t.description,
+        "created_at": t.created_at.isoformat(),
+        "due_date": t.due_date.isoformat() if t.due_date else None,
+        "is_completed": t.is_completed,
+        "thought_id": t.thought_id
+    }
+
+
+def _task_from_dict(t: dict) -> Task:
+    return Task(
+        id=t["id"],
+        title=t["title"],
+        description=t.get("description", ""),
+        created_at=parse_datetime(t["created_at"]) or datetime.now(),
+        due_date=parse_datetime(t.get("due_date")),
+        is_completed=t.get("is_completed", False),
+        thought_id=t.get("thought_id")
+    )
+
+
+def _load_tasks() -> List[Task]:
+    """Read tasks from the JSON file."""
     ensure_data_dir()
     try:
         data = json.loads(TASKS_FILE.read_text())
-        return [
-            Task(
-                id=t["id"],
-                title=t["title"],
-                description=t.get("description", ""),
-                created_at=parse_datetime(t["created_at"]) or datetime.now(),
-                due_date=parse_datetime(t.get("due_date")),
-                is_completed=t.get("is_completed", False),
-                thought_id=t.get("thought_id")
-            )
-            for t in data
-        ]
+        return [_task_from_dict(t) for t in data]
     except:
         return []
 
 
+def _task_index() -> Dict[str, Task]:
+    """Get the in-memory task index, (re)loading it if the file changed."""
+    global _tasks, _tasks_version
+    ensure_data_dir()
+    if _tasks is None or _file_version(TASKS_FILE) != _tasks_version:
+        with _lock:
+            version = _file_version(TASKS_FILE)
+            if _tasks is None or version != _tasks_version:
+                reloaded = _tasks is not None
+                tasks = {t.id: t for t in _load_tasks()}
+                due_changed = False
+                if reloaded:
+                    _update_titles(_tasks, tasks)
+                    for task_id in _tasks.keys() - tasks.keys():
+                        due_changed |= _due.remove(task_id)
+                for t in tasks.values():
+                    due_changed |= _due.update(t)
+                _tasks = tasks
+                _tasks_version = version
+                if reloaded and due_changed:
+                    _notify_due_listeners()
+    return _tasks
+
+
+def _title_index() -> TitleIndex:
+    """
+    Get the duplicate title index, building it on first use. Signatures are
+    computed outside the lock, then tasks changed in the meantime are applied.
+    """
+    global _titles
+    if _titles is None:
+        with _lock:
+            tasks = dict(_task_index())
+        titles = TitleIndex()
+        for t in tasks.values():
+            titles.add(t.id, t.title)
+        with _lock:
+            if _titles is None:
+                _titles = titles
+                _update_titles(tasks, _task_index())
+    return _titles
+
+
+def _index_title(task: Task):
+    """Add or re-index a task's title, if the title index has been built."""
+    if _titles is not None:
+        _titles.add(task.id, task.title)
+
+
+def _unindex_title(task_id: str):
+    if _titles is not None:
+        _titles.remove(task_id)
+
+
+def _update_titles(old: Dict[str, Task], new: Dict[str, Task]):
+    """Bring the title index from `old` tasks to `new` ones, re-hashing only changed titles."""
+    if _titles is None:
+        return
+    for task_id in old.keys() - new.keys():
+        _titles.remove(task_id)
+    for t in new.values():
+        before = old.get(t.id)
+        if before is None or before.title != t.title:
+            _titles.add(t.id, t.title)
+
+
+def get_all_tasks() -> List[Task]:
+    """Get all tasks."""
+    return list(_task_index().values())
+
+
 def get_task_by_id(task_id: str) -> Optional[Task]:
     """Get a task by ID."""
-    tasks = get_all_tasks()
-    for t in tasks:
-        if t.id == task_id:
-            return t
-    return None
+    return _task_index().get(task_id)
+
+
+def find_duplicate_tasks(title: str, exclude_id: Optional[str] = None) -> List[Tuple[Task, float]]:
+    """Find existing tasks whose title duplicates `title`, with their similarity."""
+    titles = _title_index()
+    with _lock:
+        tasks = _task_index()
+        return [(tasks[task_id], similarity) for task_id, similarity in titles.find(title, exclude_id)]
 
 
 def add_task(task: Task) -> Task:
     """Add a new task."""
-    ensure_data_dir()
-    tasks = get_all_tasks()
-    tasks.append(task)
-    _save_tasks(tasks)
+    with _write_lock():
+        _task_index()[task.id] = task
+        _index_title(task)
+        due_changed = _due.update(task)
+        _save_tasks()
+        _history_store().record("task", task.id, None, _task_to_dict(task))
+    if due_changed:
+        _notify_due_listeners()
     return task
 
 
 def add_tasks(new_tasks: List[Task]) -> List[Task]:
     """Add multiple tasks."""
-    ensure_data_dir()
-    tasks = get_all_tasks()
-    tasks.extend(new_tasks)
-    _save_tasks(tasks)
+    with _write_lock():
+        tasks = _task_index()
+        due_changed = False
+        for task in new_tasks:
+            tasks[task.id] = task
+            _index_title(task)
+            due_changed |= _due.update(task)
+        _save_tasks()
+        for task in new_tasks:
+            _history_store().record("task", task.id, None, _task_to_dict(task))
+    if due_changed:
+        _notify_due_listeners()
     return new_tasks
 
 
 def update_task(task_id: str, updates: dict) -> Optional[Task]:
     """Update a task."""
-    tasks = get_all_tasks()
-    for i, t in enumerate(tasks):
-        if t.id == task_id:
-            task_dict = t.model_dump()
-            task_dict.update({k: v for k, v in updates.items() if v is not None})
-            tasks[i] = Task(**task_dict)
-            _save_tasks(tasks)
-            return tasks[i]
-    return None
+    with _write_lock():
+        tasks = _task_index()
+        t = tasks.get(task_id)
+        if t is None:
+            return None
+        task_dict = t.model_dump()
+        task_dict.update({k: v for k, v in updates.items() if v is not None})
+        updated = tasks[task_id] = Task(**task_dict)
+        if updated.title != t.title:
+            _index_title(updated)
+        due_changed = _due.update(updated)
+        _save_tasks()
+        _history_store().record("task", task_id, _task_to_dict(t), _task_to_dict(updated))
+    if due_changed:
+        _notify_due_listeners()
+    return updated
 
 
 def delete_task(task_id: str) -> bool:
     """Delete a task."""
-    tasks = get_all_tasks()
-    new_tasks = [t for t in tasks if t.id != task_id]
-    if len(new_tasks) == len(tasks):
-        return False
-    _save_tasks(new_tasks)
+    with _write_lock():
+        t = _task_index().pop(task_id, None)
+        if t is None:
+            return False
+        _unindex_title(task_id)
+        due_changed = _due.remove(task_id)
+        _save_tasks()
+        _history_store().record("task", task_id, _task_to_dict(t), None)
+    if due_changed:
+        _notify_due_listeners()
     return True
 
 
-def _save_tasks(tasks: List[Task]):
-    """Save tasks to file."""
-    data = [
-        {
-            "id": t.id,
-            "title": t.title,
-            "description": t.description,
-            "created_at": t.created_at.isoformat(),
-            "due_date": t.due_date.isoformat() if t.due_date else None,
-            "is_completed": t.is_completed,
-            "thought_id": t.thought_id
-        }
-        for t in tasks
-    ]
-    TASKS_FILE.write_text(json.dumps(data, indent=2))
+def _save_tasks():
+    """Save the task index to file."""
+    global _tasks_version
+    data = [_task_to_dict(t) for t in _task_index().values()]
+    _write_atomic(TASKS_FILE, json.dumps(data, indent=2))
+    _tasks_version = _file_version(TASKS_FILE)
+
 
+# ========== DUE DATES ==========
+
+def subscribe_due_changes(callback: Callable[[], None]):
+    """Register a callback to run after the due index changes (a task's due date, completion, or deletion)."""
+    _due_listeners.append(callback)
+
+
+def _notify_due_listeners():
+    for callback in _due_listeners:
+        callback()
+
+
+def get_tasks_due_before(when: datetime) -> List[Task]:
+    """Get incomplete tasks due before `when`, earliest first."""
+    with _lock:
+        tasks = _task_index()
+        return [tasks[task_id] for task_id in _due.due_before(when)]
+
+
+def get_tasks_due_between(start: datetime, end: datetime) -> List[Task]:
+    """Get incomplete tasks due after `start` and up to `end`, earliest first."""
+    with _lock:
+        tasks = _task_index()
+        return [tasks[task_id] for task_id in _due.due_between(start, end)]
+
+
+def get_next_due_after(when: datetime) -> Optional[datetime]:
+    """Get the earliest due date of an incomplete task after `when`."""
+    with _lock:
+        _task_index()
+        return _due.next_due_after(when)
+
+
+def get_reminder_checkpoint() -> Optional[datetime]:
+    """Get the time up to which due reminders were delivered, if any were."""
+    try:
+        data = json.loads(REMINDERS_FILE.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+    return parse_datetime(data.get("checked_until"))
+
+
+def set_reminder_checkpoint(when: datetime):
+    """Record that due reminders were delivered up to `when`."""
+    ensure_data_dir()
+    _write_atomic(REMINDERS_FILE, json.dumps({"checked_until": when.isoformat()}))
+
+
+# ========== HISTORY ==========
+
+def _history_store() -> HistoryStore:
+    """Get the revision history, loading it on first use and reloading it if another process changed it."""
+    global _history
+    with _lock:
+        if _history is None:
+            ensure_data_dir()
+            _history = HistoryStore(HISTORY_DIR)
+        else:
+            _history.refresh()
+    return _history
+
+
+def get_history(record_id: str) -> List[dict]:
+    """Get the retained revisions of a thought or task, oldest first."""
+    with _lock:
+        return _history_store().revisions(record_id)
+
+
+def get_revision(record_id: str, rev: int) -> Optional[Tuple[str, Optional[dict]]]:
+    """Get (kind, state) of a record at a revision. State is None if it was deleted."""
+    with _lock:
+        try:
+            return _history_store().state_at(record_id, rev)
+        except KeyError:
+            return None
+
+
+def restore_revision(record_id: str, rev: int) -> Optional[Union[Thought, Task]]:
+    """
+    Restore a thought or task to its state at a revision, recreating it if
+    it was deleted since. Returns None if the revision doesn't exist; raises
+    ValueError if the record was deleted at that revision.
+    """
+    with _write_lock():
+        revision = get_revision(record_id, rev)
+        if revision is None:
+            return None
+        kind, state = revision
+        if state is None:
+            raise ValueError(f"Record was deleted at revision {rev}")
+
+        due_changed = False
+        if kind == "thought":
+            before = _thought_index().get(record_id)
+            restored = _thought_from_dict(state)
+            _thought_index()[record_id] = restored
+            _save_thoughts()
+            before_dict = _thought_to_dict(before) if before else None
+        else:
+            before = _task_index().get(record_id)
+            restored = _task_from_dict(state)
+            _task_index()[record_id] = restored
+            _index_title(restored)
+            due_changed = _due.update(restored)
+            _save_tasks()
+            before_dict = _task_to_dict(before) if before else None
+        _history_store().record(kind, record_id, before_dict, state, op="restore")
+    if due_changed:
+        _notify_due_listeners()
+    return restored
+
+
+def list_snapshots() -> List[dict]:
+    """Get the retained history snapshots, oldest first."""
+    with _lock:
+        return _history_store().snapshots()
+
+
+def snapshot_history() -> Optional[dict]:
+    """Seal recent changes into a compressed snapshot. None if nothing changed."""
+    with _lock:
+        return _history_store().snapshot()
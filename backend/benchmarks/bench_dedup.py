@@ -0,0 +1,113 @@
+"""
+Duplicate title index: build time, lookup cost and recall.
+
+Indexes synthetic task titles ("<verb> <object> [<qualifier>]", with ~15%
+near-duplicates of earlier titles) and, for a sample of lookups, reports the
+LSH candidates checked per lookup and the share of true duplicates (exact
+Jaccard >= SIMILARITY_THRESHOLD, found by brute force) that were returned.
+
+Candidates are split by their exact similarity to the looked-up title:
+unrelated ones (< 0.3, e.g. titles that only share a verb) are LSH false
+positives, near misses (0.3 up to the threshold) track how many such pairs
+the data contains. Both should stay a small number per lookup, so lookup
+time stays roughly flat as the index grows.
+
+Run from the backend directory:
+    python -m benchmarks.bench_dedup --records 1000 5000 20000
+"""
+import argparse
+import random
+import string
+import time
+from typing import List
+
+from app.services import dedup
+
+VERBS = (
+    "buy call email fix book review send pay clean plan schedule write read update cancel renew "
+    "order pick return check prepare submit finish start draft sign print visit water walk text "
+    "ask follow backup install test deploy document organize"
+).split()
+QUALIFIERS = ["today", "tomorrow", "asap", "before friday", "this week", "after lunch", "on monday"]
+# Rough English letter frequencies, so made-up words share shingles like real ones
+LETTER_WEIGHTS = [8, 1.5, 2.8, 4.3, 12.7, 2.2, 2, 6.1, 7, 0.2, 0.8, 4, 2.4, 6.7, 7.5, 1.9, 0.1, 6, 6.3, 9.1, 2.8, 1, 2.4, 0.2, 2, 0.1]
+
+
+def make_titles(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    objects = ["".join(rng.choices(string.ascii_lowercase, LETTER_WEIGHTS, k=rng.randint(3, 9))) for _ in range(5000)]
+    titles: List[str] = []
+    for _ in range(count):
+        if titles and rng.random() < 0.15:
+            title = rng.choice(titles)
+            variant = rng.random()
+            if variant < 0.3:
+                title += "!"
+            elif variant < 0.6:
+                title += " " + rng.choice(QUALIFIERS)
+            elif variant < 0.8:
+                i = rng.randrange(len(title))
+                title = title[:i] + title[i + 1:]
+            else:
+                title = title.title()
+        else:
+            title = f"{rng.choice(VERBS)} {' '.join(rng.sample(objects, rng.randint(1, 2)))}"
+            if rng.random() < 0.3:
+                title += " " + rng.choice(QUALIFIERS)
+        titles.append(title)
+    return titles
+
+
+def run(count: int, lookups: int):
+    titles = make_titles(count)
+    dedup._shingle_hashes.cache_clear()
+
+    start = time.perf_counter()
+    index = dedup.TitleIndex()
+    for i, title in enumerate(titles):
+        index.add(str(i), title)
+    build = time.perf_counter() - start
+
+    shingle_sets = [dedup.shingles(dedup.normalize_title(t)) for t in titles]
+    sample = random.Random(1).sample(range(count), min(lookups, count))
+    unrelated = near = expected = found = 0
+    lookup_time = 0.0
+    for i in sample:
+        signature = dedup.minhash(shingle_sets[i])
+        candidates = set().union(*(index._buckets.get(key, ()) for key in dedup._bands(signature))) - {str(i)}
+        for task_id in candidates:
+            similarity = dedup.jaccard(shingle_sets[i], shingle_sets[int(task_id)])
+            unrelated += similarity < 0.3
+            near += 0.3 <= similarity < dedup.SIMILARITY_THRESHOLD
+
+        start = time.perf_counter()
+        matches = {task_id for task_id, _ in index.find(titles[i], exclude_id=str(i))}
+        lookup_time += time.perf_counter() - start
+
+        for j, other in enumerate(shingle_sets):
+            if j != i and dedup.jaccard(shingle_sets[i], other) >= dedup.SIMILARITY_THRESHOLD:
+                expected += 1
+                found += str(j) in matches
+
+    n = len(sample)
+    print(
+        f"{count:>7,} titles  build {build * 1000:7.0f} ms  "
+        f"lookup {lookup_time / n * 1e6:6.0f} us  "
+        f"candidates/lookup: unrelated {unrelated / n:5.2f}  near {near / n:5.2f}  "
+        f"recall {found}/{expected} = {found / max(expected, 1):.3f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--lookups", type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"{dedup.NUM_BANDS} bands x {dedup.ROWS_PER_BAND} rows, threshold {dedup.SIMILARITY_THRESHOLD}")
+    for count in args.records:
+        run(count, args.lookups)
+
+
+if __name__ == "__main__":
+    main()
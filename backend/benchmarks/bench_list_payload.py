@@ -0,0 +1,86 @@
+"""
+Payload size and serialization time for the list endpoints.
+
+Compares serializing through the response models (the old behaviour) with
+the projected serializer, full and `fields=`/`view=summary` variants, and
+reports compressed sizes.
+
+Run from the backend directory:
+    python -m benchmarks.bench_list_payload --records 5000
+"""
+import argparse
+import gzip
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.compression import CompressionMiddleware
+from app.models import Task, Thought
+from app.services import serialization
+
+
+def make_records(count: int):
+    start = datetime(2024, 1, 1)
+    thoughts = [
+        Thought(id=f"thought-{i}", content=f"Thought number {i}. " * 40, timestamp=start + timedelta(hours=i))
+        for i in range(count)
+    ]
+    tasks = [
+        Task(id=f"task-{i}", title=f"Task number {i}", created_at=start + timedelta(hours=i), thought_id=f"thought-{i}")
+        for i in range(count)
+    ]
+    return thoughts, tasks
+
+
+def timed(fn, repeat: int = 5):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t)
+    return result, best
+
+
+def report(name: str, body: bytes, seconds: float):
+    sizes = f"{len(body):>10,} B  gzip {len(gzip.compress(body, 6)):>9,} B"
+    if "br" in CompressionMiddleware(app=None).encodings:
+        sizes += f"  br {len(CompressionMiddleware.compress(body, 'br')):>9,} B"
+    print(f"{name:<32} {seconds * 1000:8.1f} ms  {sizes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=5000)
+    args = parser.parse_args()
+
+    thoughts, tasks = make_records(args.records)
+    thought_adapter = TypeAdapter(List[Thought])
+    task_adapter = TypeAdapter(List[Task])
+
+    def response_model(adapter, records):
+        # What FastAPI does for response_model=List[...]: validate, dump, json.dumps
+        return json.dumps(adapter.dump_python(adapter.validate_python(records), mode="json")).encode()
+
+    def projected(records, fields, to_row=None):
+        return serialization.json_response(serialization.project(records, fields, to_row)).body
+
+    cases = [
+        ("tasks: response model", lambda: response_model(task_adapter, tasks)),
+        ("tasks: projected, all fields", lambda: projected(tasks, serialization.TASK_FIELDS)),
+        ("tasks: fields=id,title,due_date", lambda: projected(tasks, ("id", "title", "due_date"))),
+        ("thoughts: response model", lambda: response_model(thought_adapter, thoughts)),
+        ("thoughts: projected, all fields", lambda: projected(thoughts, serialization.THOUGHT_FIELDS)),
+        ("thoughts: view=summary", lambda: projected(
+            thoughts, serialization.THOUGHT_SUMMARY_FIELDS, serialization.thought_summary)),
+        ("thoughts: fields=id,timestamp", lambda: projected(thoughts, ("id", "timestamp"))),
+    ]
+    for name, fn in cases:
+        body, seconds = timed(fn)
+        report(name, body, seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Cold start benchmark for the backend.
+
+Measures, each in a fresh interpreter:
+  - the time to import app.main
+  - the latency of the first GET /api/tasks and /api/thoughts after startup
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup --runs 5 --records 2000
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+IMPORT_CODE = """
+import sys, time
+t = time.perf_counter()
+import app.main
+print(time.perf_counter() - t, "openai" in sys.modules)
+"""
+
+FIRST_REQUEST_CODE = """
+import sys, time
+from pathlib import Path
+from fastapi.testclient import TestClient
+
+import app.main
+from app.services import storage
+
+data_dir = Path(sys.argv[1])
+storage.DATA_DIR = data_dir
+storage.THOUGHTS_FILE = data_dir / "thoughts.json"
+storage.TASKS_FILE = data_dir / "tasks.json"
+storage.HISTORY_DIR = data_dir / "history"
+
+with TestClient(app.main.app) as client:
+    t = time.perf_counter()
+    client.get("/api/tasks").raise_for_status()
+    first_tasks = time.perf_counter() - t
+    t = time.perf_counter()
+    client.get("/api/thoughts").raise_for_status()
+    first_thoughts = time.perf_counter() - t
+print(first_tasks, first_thoughts)
+"""
+
+
+def seed_data(data_dir: Path, records: int):
+    """Write `records` thoughts and tasks to a scratch data directory."""
+    start = datetime(2024, 1, 1)
+    thoughts = []
+    tasks = []
+    for i in range(records):
+        ts = (start + timedelta(hours=i)).isoformat()
+        thoughts.append({"id": f"thought-{i}", "content": f"Thought number {i}. " * 20, "timestamp": ts})
+        tasks.append({
+            "id": f"task-{i}",
+            "title": f"Task number {i}",
+            "description": "",
+            "created_at": ts,
+            "due_date": None,
+            "is_completed": i % 3 == 0,
+            "thought_id": f"thought-{i}",
+        })
+    (data_dir / "thoughts.json").write_text(json.dumps(thoughts))
+    (data_dir / "tasks.json").write_text(json.dumps(tasks))
+
+
+def run_child(code: str, *args: str) -> list:
+    out = subprocess.run(
+        [sys.executable, "-c", code, *args],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    return out.stdout.split()
+
+
+def report(name: str, samples: list):
+    ms = [s * 1000 for s in samples]
+    print(f"{name:<28} median {statistics.median(ms):8.1f} ms   min {min(ms):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--records", type=int, default=2000)
+    args = parser.parse_args()
+
+    import_times = []
+    openai_loaded = False
+    for _ in range(args.runs):
+        elapsed, loaded = run_child(IMPORT_CODE)
+        import_times.append(float(elapsed))
+        openai_loaded = openai_loaded or loaded == "True"
+    report("import app.main", import_times)
+    print(f"{'openai imported eagerly':<28} {openai_loaded}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_data(Path(tmp), args.records)
+        first_tasks, first_thoughts = [], []
+        for _ in range(args.runs):
+            tasks_s, thoughts_s = run_child(FIRST_REQUEST_CODE, tmp)
+            first_tasks.append(float(tasks_s))
+            first_thoughts.append(float(thoughts_s))
+    report("first GET /api/tasks", first_tasks)
+    report("first GET /api/thoughts", first_thoughts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+import pytest
+
+from app.services import storage
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Point storage at an empty data directory for each test."""
+    monkeypatch.setattr(storage, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(storage, "THOUGHTS_FILE", tmp_path / "thoughts.json")
+    monkeypatch.setattr(storage, "TASKS_FILE", tmp_path / "tasks.json")
+    monkeypatch.setattr(storage, "HISTORY_DIR", tmp_path / "history")
+    monkeypatch.setattr(storage, "REMINDERS_FILE", tmp_path / "reminders.json")
+    storage.reset_indexes()
+    yield tmp_path
+    storage.release_background_jobs()
+    storage.reset_indexes()
@@ -0,0 +1,114 @@
+import json
+import os
+import random
+from datetime import datetime
+
+from app.models import Task
+from app.services import dedup, storage
+from app.services.dedup import TitleIndex, jaccard, normalize_title, shingles
+from benchmarks.bench_dedup import make_titles
+
+
+def test_normalize_title():
+    assert normalize_title("  Buy   MILK!! ") == "buy milk"
+    assert normalize_title("e-mail: the boss") == "e mail the boss"
+    assert normalize_title("!!!") == ""
+
+
+def test_finds_exact_and_near_duplicates():
+    index = TitleIndex()
+    index.add("1", "Buy milk")
+    index.add("2", "Call the dentist about the appointment")
+    index.add("3", "Water the plants")
+
+    assert index.find("buy milk!") == [("1", 1.0)]
+    near = index.find("Call the dentist about appointment")
+    assert [task_id for task_id, _ in near] == ["2"]
+    assert dedup.SIMILARITY_THRESHOLD <= near[0][1] < 1.0
+    assert index.find("Book flights to Lisbon") == []
+
+
+def test_excludes_task_itself():
+    index = TitleIndex()
+    index.add("1", "Buy milk")
+    index.add("2", "Buy milk")
+    assert index.find("Buy milk", exclude_id="1") == [("2", 1.0)]
+
+
+def test_titles_without_words_are_ignored():
+    index = TitleIndex()
+    index.add("1", "!!!")
+    index.add("2", "???")
+    assert len(index) == 0
+    assert index.find("...") == []
+
+
+def test_remove_and_readd_update_buckets():
+    index = TitleIndex()
+    index.add("1", "Renew passport")
+    index.add("1", "Schedule car service")
+    assert index.find("Renew passport") == []
+    assert index.find("Schedule car service") == [("1", 1.0)]
+
+    index.remove("1")
+    index.remove("1")
+    assert len(index) == 0
+    assert not index._exact and not index._buckets
+
+
+def test_signatures_are_stable():
+    signature = dedup.minhash(shingles("buy milk"))
+    dedup._shingle_hashes.cache_clear()
+    assert dedup.minhash(shingles("buy milk")) == signature
+    assert len(signature) == dedup.NUM_BANDS * dedup.ROWS_PER_BAND
+
+
+def test_lsh_recall_against_brute_force():
+    titles = make_titles(2000)
+    index = TitleIndex()
+    for i, title in enumerate(titles):
+        index.add(str(i), title)
+    shingle_sets = [shingles(normalize_title(t)) for t in titles]
+
+    expected = found = 0
+    for i in random.Random(1).sample(range(len(titles)), 200):
+        matches = {task_id for task_id, _ in index.find(titles[i], exclude_id=str(i))}
+        for j, other in enumerate(shingle_sets):
+            if j != i and jaccard(shingle_sets[i], other) >= dedup.SIMILARITY_THRESHOLD:
+                expected += 1
+                found += str(j) in matches
+    assert expected > 0
+    assert found / expected >= 0.9
+
+
+def make_task(task_id: str, title: str) -> Task:
+    return Task(id=task_id, title=title, created_at=datetime(2024, 1, 1))
+
+
+def test_storage_builds_title_index_on_first_lookup():
+    storage.add_task(make_task("t1", "Buy milk"))
+    storage.get_all_tasks()
+    assert storage._titles is None
+
+    assert [t.id for t, _ in storage.find_duplicate_tasks("buy milk")] == ["t1"]
+    storage.add_task(make_task("t2", "Buy milk."))
+    assert {t.id for t, _ in storage.find_duplicate_tasks("buy milk")} == {"t1", "t2"}
+
+
+def test_storage_title_index_follows_other_writers(data_dir):
+    storage.add_tasks([make_task("t1", "Buy milk"), make_task("t2", "Water the plants")])
+    storage.find_duplicate_tasks("anything")
+
+    # Another process rewrites the file: t1 renamed, t2 deleted, t3 added
+    tasks_file = data_dir / "tasks.json"
+    data = {t["id"]: t for t in json.loads(tasks_file.read_text())}
+    data["t1"]["title"] = "Renew passport"
+    del data["t2"]
+    data["t3"] = {**data["t1"], "id": "t3", "title": "Book flights"}
+    tasks_file.write_text(json.dumps(list(data.values())))
+    os.utime(tasks_file, ns=(0, 0))
+
+    assert storage.find_duplicate_tasks("Buy milk") == []
+    assert storage.find_duplicate_tasks("Water the plants") == []
+    assert [t.id for t, _ in storage.find_duplicate_tasks("renew passport")] == ["t1"]
+    assert [t.id for t, _ in storage.find_duplicate_tasks("book flights")] == ["t3"]
@@ -0,0 +1,163 @@
+import asyncio
+import gzip
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from app import main
+from app.models import Task
+from app.services import storage
+from app.services.history import ACTIVE_SEGMENT, HistoryStore, fold
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def make_task(task_id: str, title: str = "Task") -> Task:
+    return Task(id=task_id, title=title, created_at=datetime(2024, 1, 1))
+
+
+def test_fold():
+    assert fold([]) is None
+    assert fold([
+        {"op": "create", "changes": {"title": "a", "done": False}},
+        {"op": "update", "changes": {"done": True}},
+    ]) == {"title": "a", "done": True}
+    assert fold([
+        {"op": "base", "changes": {"title": "a"}},
+        {"op": "delete", "changes": {}},
+    ]) is None
+
+
+def test_records_only_changed_fields(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.record("task", "t1", None, {"title": "a", "done": False})
+    store.record("task", "t1", {"title": "a", "done": False}, {"title": "a", "done": True})
+    store.record("task", "t1", {"title": "a", "done": True}, {"title": "a", "done": True})
+    store.record("task", "t1", {"title": "a", "done": True}, None)
+
+    revisions = store.revisions("t1")
+    assert [(r["rev"], r["op"], r["changes"]) for r in revisions] == [
+        (1, "create", {"title": "a", "done": False}),
+        (2, "update", {"done": True}),
+        (3, "delete", {}),
+    ]
+    assert store.state_at("t1", 2) == ("task", {"title": "a", "done": True})
+    assert store.state_at("t1", 3) == ("task", None)
+    with pytest.raises(KeyError):
+        store.state_at("t1", 4)
+
+
+def test_inserts_base_revision_for_records_without_history(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.record("thought", "th1", {"content": "old"}, {"content": "new"})
+
+    assert [(r["rev"], r["op"]) for r in store.revisions("th1")] == [(1, "base"), (2, "update")]
+    assert store.state_at("th1", 1) == ("thought", {"content": "old"})
+
+
+def test_retention_folds_oldest_snapshot_into_base_revision(tmp_path):
+    store = HistoryStore(tmp_path, retention=2)
+    store.record("task", "t1", None, {"title": "v1"})
+    store.record("task", "t1", {"title": "v1"}, {"title": "v2"})
+    store.record("task", "gone", None, {"title": "x"})
+    store.record("task", "gone", {"title": "x"}, None)
+    store.snapshot()
+    store.record("task", "t1", {"title": "v2"}, {"title": "v3"})
+    store.snapshot()
+    store.record("task", "t1", {"title": "v3"}, {"title": "v4"})
+    store.snapshot()
+
+    assert len(store.snapshots()) == 2
+    for reloaded in (store, HistoryStore(tmp_path, retention=2)):
+        assert [(r["rev"], r["op"]) for r in reloaded.revisions("t1")] == [(2, "base"), (3, "update"), (4, "update")]
+        assert reloaded.state_at("t1", 2) == ("task", {"title": "v2"})
+        assert reloaded.state_at("t1", 4) == ("task", {"title": "v4"})
+        with pytest.raises(KeyError):
+            reloaded.state_at("t1", 1)
+        assert reloaded.revisions("gone") == []
+
+
+def test_snapshot_without_changes_is_skipped(tmp_path):
+    store = HistoryStore(tmp_path)
+    assert store.snapshot() is None
+    store.record("task", "t1", None, {"title": "a"})
+    assert store.snapshot()["seq"] == 1
+    assert store.snapshot() is None
+
+
+def test_recovers_from_crash_between_snapshot_and_truncate(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.record("task", "t1", None, {"title": "a"})
+    active = (tmp_path / ACTIVE_SEGMENT).read_bytes()
+    store.snapshot()
+    # Crash after the snapshot was written but before the active segment was removed
+    (tmp_path / ACTIVE_SEGMENT).write_bytes(active)
+    (tmp_path / "snapshot-000000000009-20240101T000000.jsonl.gz.tmp").write_bytes(gzip.compress(b"partial"))
+
+    reloaded = HistoryStore(tmp_path)
+    assert len(reloaded.revisions("t1")) == 1
+    assert not (tmp_path / ACTIVE_SEGMENT).exists()
+    reloaded.record("task", "t1", {"title": "a"}, {"title": "b"})
+    assert [r["seq"] for r in reloaded.revisions("t1")] == [1, 2]
+
+
+def test_concurrent_processes_keep_every_entry(tmp_path):
+    script = f"""
+from pathlib import Path
+from app.services.history import HistoryStore
+
+store = HistoryStore(Path({str(tmp_path)!r}))
+for i in range(40):
+    store.record("task", "%s-%d" % ({{prefix!r}}, i), None, {{{{"title": str(i)}}}})
+    if i % 10 == 9:
+        store.snapshot()
+"""
+    workers = [
+        subprocess.Popen([sys.executable, "-c", script.format(prefix=f"w{n}")], cwd=BACKEND_DIR)
+        for n in range(3)
+    ]
+    assert all(w.wait() == 0 for w in workers)
+
+    store = HistoryStore(tmp_path)
+    entries = [r for n in range(3) for i in range(40) for r in store.revisions(f"w{n}-{i}")]
+    assert len(entries) == 120
+    assert sorted(e["seq"] for e in entries) == list(range(1, 121))
+
+
+def test_restore_deleted_task():
+    storage.add_task(make_task("t1", "Original"))
+    storage.update_task("t1", {"title": "Renamed"})
+    storage.delete_task("t1")
+
+    restored = storage.restore_revision("t1", 1)
+    assert restored.title == "Original"
+    assert storage.get_task_by_id("t1").title == "Original"
+    assert [r["op"] for r in storage.get_history("t1")] == ["create", "update", "delete", "restore"]
+
+    with pytest.raises(ValueError):
+        storage.restore_revision("t1", 3)
+    assert storage.restore_revision("t1", 99) is None
+
+
+def test_snapshot_loop_survives_failures(monkeypatch):
+    calls = []
+
+    def flaky_snapshot():
+        calls.append(None)
+        if len(calls) == 1:
+            raise OSError("disk full")
+
+    monkeypatch.setattr(main, "SNAPSHOT_INTERVAL_SECONDS", 0)
+    monkeypatch.setattr(storage, "snapshot_history", flaky_snapshot)
+
+    async def run_briefly():
+        task = asyncio.create_task(main.snapshot_history_periodically())
+        while len(calls) < 3:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(asyncio.wait_for(run_briefly(), timeout=5))
+    assert len(calls) >= 3
@@ -0,0 +1,178 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from app.models import Task
+from app.services import storage
+from app.services.scheduling import DueIndex, ReminderScheduler, as_local_naive
+
+BASE = datetime(2024, 1, 1, 12, 0)
+
+
+def make_task(task_id: str, due_date=None, is_completed: bool = False, title: str = "Task") -> Task:
+    return Task(id=task_id, title=title, created_at=BASE, due_date=due_date, is_completed=is_completed)
+
+
+def test_as_local_naive():
+    aware = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+    assert as_local_naive(aware).tzinfo is None
+    assert as_local_naive(aware) == aware.astimezone().replace(tzinfo=None)
+    assert as_local_naive(BASE) is BASE
+
+
+def test_due_index_ranges():
+    index = DueIndex()
+    for i, hours in enumerate([3, 1, 2, 2]):
+        index.update(make_task(f"t{i}", BASE + timedelta(hours=hours)))
+    index.update(make_task("done", BASE, is_completed=True))
+    index.update(make_task("undated"))
+
+    assert len(index) == 4
+    assert index.due_before(BASE + timedelta(hours=2)) == ["t1"]
+    assert index.due_before(BASE + timedelta(hours=2, seconds=1)) == ["t1", "t2", "t3"]
+    # (start, end]: excludes tasks due exactly at start, includes those due at end
+    assert index.due_between(BASE + timedelta(hours=1), BASE + timedelta(hours=2)) == ["t2", "t3"]
+    assert index.due_between(BASE + timedelta(hours=3), BASE + timedelta(hours=9)) == []
+    assert index.next_due_after(BASE + timedelta(hours=1)) == BASE + timedelta(hours=2)
+    assert index.next_due_after(BASE + timedelta(hours=3)) is None
+
+
+def test_due_index_mixes_naive_and_aware_datetimes():
+    index = DueIndex()
+    aware = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+    local = as_local_naive(aware)
+    index.update(make_task("aware", aware))
+    index.update(make_task("naive", local + timedelta(minutes=1)))
+
+    assert index.due_before(local + timedelta(seconds=1)) == ["aware"]
+    assert index.due_between(aware - timedelta(minutes=1), aware + timedelta(minutes=5)) == ["aware", "naive"]
+    assert index.next_due_after(aware) == local + timedelta(minutes=1)
+
+
+def test_due_index_update_reports_changes():
+    index = DueIndex()
+    assert index.update(make_task("t1", BASE))
+    assert not index.update(make_task("t1", BASE, title="Renamed"))
+    assert index.update(make_task("t1", BASE + timedelta(hours=1)))
+    assert index.due_before(BASE + timedelta(minutes=30)) == []
+    assert index.update(make_task("t1", BASE, is_completed=True))
+    assert len(index) == 0
+    assert not index.update(make_task("t1", BASE, is_completed=True))
+    assert not index.remove("t1")
+    assert not index.update(make_task("t2"))
+
+
+def test_storage_notifies_only_when_due_index_changes(monkeypatch):
+    notified = []
+    monkeypatch.setattr(storage, "_due_listeners", [lambda: notified.append(None)])
+
+    storage.add_task(make_task("t1"))
+    storage.update_task("t1", {"title": "Renamed"})
+    assert notified == []
+
+    storage.update_task("t1", {"due_date": BASE})
+    assert len(notified) == 1
+    storage.update_task("t1", {"description": "details"})
+    assert len(notified) == 1
+    storage.update_task("t1", {"is_completed": True})
+    assert len(notified) == 2
+    storage.delete_task("t1")
+    assert len(notified) == 2
+
+
+class FakeTasks:
+    """In-memory due dates for driving the scheduler directly."""
+
+    def __init__(self):
+        self.index = DueIndex()
+        self.tasks = {}
+
+    def add(self, task: Task):
+        self.tasks[task.id] = task
+        self.index.update(task)
+
+    def next_due_after(self, when: datetime):
+        return self.index.next_due_after(when)
+
+    def due_between(self, start: datetime, end: datetime) -> List[Task]:
+        return [self.tasks[task_id] for task_id in self.index.due_between(start, end)]
+
+
+def run_scheduler(scheduler: ReminderScheduler, until, scenario=None, timeout: float = 5):
+    async def main():
+        runner = asyncio.create_task(scheduler.run())
+        try:
+            if scenario is not None:
+                await scenario()
+            while not until():
+                await asyncio.sleep(0.01)
+        finally:
+            runner.cancel()
+
+    asyncio.run(asyncio.wait_for(main(), timeout))
+
+
+def test_scheduler_wakes_at_next_due_time():
+    tasks = FakeTasks()
+    delivered = []
+    tasks.add(make_task("soon", datetime.now() + timedelta(seconds=0.2)))
+    tasks.add(make_task("later", datetime.now() + timedelta(hours=1)))
+    scheduler = ReminderScheduler(tasks.next_due_after, tasks.due_between, delivered.extend)
+
+    run_scheduler(scheduler, until=lambda: delivered)
+    assert [t.id for t in delivered] == ["soon"]
+    assert datetime.now() >= tasks.tasks["soon"].due_date
+
+
+def test_scheduler_wakes_when_notified_of_earlier_task():
+    tasks = FakeTasks()
+    delivered = []
+    tasks.add(make_task("later", datetime.now() + timedelta(hours=1)))
+    scheduler = ReminderScheduler(tasks.next_due_after, tasks.due_between, delivered.extend)
+
+    async def add_earlier_task():
+        await asyncio.sleep(0.05)
+        tasks.add(make_task("soon", datetime.now() + timedelta(seconds=0.1)))
+        scheduler.notify()
+
+    run_scheduler(scheduler, until=lambda: delivered, scenario=add_earlier_task)
+    assert [t.id for t in delivered] == ["soon"]
+
+
+def test_scheduler_catches_up_from_checkpoint():
+    tasks = FakeTasks()
+    delivered, saved = [], []
+    now = datetime.now()
+    tasks.add(make_task("before-checkpoint", now - timedelta(hours=2)))
+    tasks.add(make_task("while-down", now - timedelta(minutes=30)))
+    scheduler = ReminderScheduler(
+        tasks.next_due_after, tasks.due_between, delivered.extend,
+        load_checkpoint=lambda: now - timedelta(hours=1),
+        save_checkpoint=saved.append,
+    )
+
+    run_scheduler(scheduler, until=lambda: delivered and saved)
+    assert [t.id for t in delivered] == ["while-down"]
+    assert saved[0] >= now
+
+
+def test_scheduler_survives_failed_delivery():
+    tasks = FakeTasks()
+    attempts = []
+
+    def failing_delivery(due: List[Task]):
+        attempts.append(due)
+        raise RuntimeError("delivery failed")
+
+    tasks.add(make_task("t1", datetime.now() + timedelta(seconds=0.05)))
+    tasks.add(make_task("t2", datetime.now() + timedelta(seconds=0.15)))
+    scheduler = ReminderScheduler(tasks.next_due_after, tasks.due_between, failing_delivery)
+
+    run_scheduler(scheduler, until=lambda: len(attempts) == 2)
+    assert [t.id for due in attempts for t in due] == ["t1", "t2"]
+
+
+def test_reminder_checkpoint_round_trip():
+    assert storage.get_reminder_checkpoint() is None
+    storage.set_reminder_checkpoint(BASE)
+    assert storage.get_reminder_checkpoint() == BASE
@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from app.models import Task, Thought
+from app.services import storage
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def make_task(task_id: str, title: str = "Task", **kwargs) -> Task:
+    return Task(id=task_id, title=title, created_at=datetime(2024, 1, 1), **kwargs)
+
+
+def add_tasks_in_subprocess(data_dir: Path, prefix: str, count: int) -> subprocess.Popen:
+    """Start another process that adds tasks to the same data directory."""
+    script = f"""
+from datetime import datetime
+from pathlib import Path
+from app.models import Task
+from app.services import storage
+
+data_dir = Path({str(data_dir)!r})
+storage.DATA_DIR = data_dir
+storage.THOUGHTS_FILE = data_dir / "thoughts.json"
+storage.TASKS_FILE = data_dir / "tasks.json"
+storage.HISTORY_DIR = data_dir / "history"
+for i in range({count}):
+    storage.add_task(Task(id="{prefix}-%d" % i, title="{prefix} %d" % i, created_at=datetime(2024, 1, 1)))
+"""
+    return subprocess.Popen([sys.executable, "-c", script], cwd=BACKEND_DIR)
+
+
+def test_writes_go_through_to_file(data_dir):
+    storage.add_task(make_task("t1", "Buy milk"))
+    storage.add_thought(Thought(id="th1", content="hello", timestamp=datetime(2024, 1, 1)))
+
+    storage.reset_indexes()
+    assert storage.get_task_by_id("t1").title == "Buy milk"
+    assert storage.get_thought_by_id("th1").content == "hello"
+    assert [t["id"] for t in json.loads((data_dir / "tasks.json").read_text())] == ["t1"]
+
+
+def test_reloads_when_another_process_writes(data_dir):
+    storage.add_task(make_task("t1"))
+    assert add_tasks_in_subprocess(data_dir, "other", 1).wait() == 0
+
+    assert {t.id for t in storage.get_all_tasks()} == {"t1", "other-0"}
+
+
+def test_concurrent_processes_dont_lose_writes(data_dir):
+    storage.ensure_data_dir()
+    workers = [add_tasks_in_subprocess(data_dir, f"w{n}", 20) for n in range(3)]
+    assert all(w.wait() == 0 for w in workers)
+
+    assert len(storage.get_all_tasks()) == 60
+    assert all(len(storage.get_history(f"w{n}-{i}")) == 1 for n in range(3) for i in range(20))
+
+
+def test_only_one_process_claims_background_jobs(data_dir):
+    assert storage.claim_background_jobs()
+    assert storage.claim_background_jobs()
+
+    script = f"""
+from pathlib import Path
+from app.services import storage
+storage.DATA_DIR = Path({str(data_dir)!r})
+raise SystemExit(0 if storage.claim_background_jobs() else 1)
+"""
+    def claim_elsewhere() -> bool:
+        return subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR).returncode == 0
+
+    assert not claim_elsewhere()
+    storage.release_background_jobs()
+    assert claim_elsewhere()